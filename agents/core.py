@@ -1,59 +1,414 @@
+import dbm
+import difflib
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import re
+import shelve
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 from swarm import Swarm, Agent
-import json
+import orjson
+
+log = logging.getLogger(__name__)
 
 # dependencies in the examples should have root dependencies added to the dependencies list
 
 # main.tf to be considered from root if root is mentioned
 
+# Files at least this large are decoded straight from a read-only mapping
+_MMAP_THRESHOLD = 64 * 1024
+
+# posix_fadvise is not available on every platform (e.g. macOS, Windows)
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+_TERRAFORM_REF_PREFIXES = ('resource:', 'data:', 'var:')
+
+# The reply cache is only an optimization: these errors from opening or
+# reading it are logged and the request goes to the model instead (dbm.dumb
+# reports a corrupt index as SyntaxError or ValueError). The lock keeps
+# concurrent sessions in this process from writing the shelve at once
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_RESPONSE_CACHE_ERRORS = (*dbm.error, OSError, pickle.PickleError, EOFError, SyntaxError, ValueError)
+
+
+def _is_file_node(node):
+    """Files in the summary structure are {} or {"dependencies": [...]}.
+
+    Mirrors github_repo_summarizer._is_file_node, which writes that structure;
+    it is kept local so this module also runs as a script from agents/.
+    """
+    return not node or isinstance(node.get('dependencies'), list)
+
+
+def _to_json(obj):
+    """Serialize obj to a JSON string with orjson, keys sorted for stable output"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+
+
+def _intern_strings(obj):
+    """Return obj with every str key and value interned.
+
+    Summary dependencies repeat the same paths and Terraform references
+    ("var:name", module paths) across many files; interning makes each
+    distinct string a single shared object.
+    """
+    if isinstance(obj, dict):
+        return {sys.intern(key): _intern_strings(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_intern_strings(value) for value in obj]
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    return obj
+
+
+class _FileIndex:
+    """Structure-of-arrays view of the summary's nested file structure.
+
+    Entry i describes paths[i], joined onto the repository root the same way
+    the summary's dependency paths are. Directories list their entries in
+    children[i]; files list the entries they depend on in deps[i], with
+    Terraform resource/data/var references dropped and module dependencies
+    pointing at the module directory. ids maps a normalized path back to i,
+    and by_basename maps a file name to the ids of every file with that name.
+    """
+    __slots__ = ('paths', 'ids', 'by_basename', 'is_dir', 'children', 'deps')
+
+    def __init__(self, structure, root_dir):
+        self.paths = [os.path.normpath(root_dir)]
+        self.is_dir = [True]
+        self.children = [[]]
+        raw_deps = [()]
+
+        stack = [(0, structure)]
+        while stack:
+            parent_id, node = stack.pop()
+            for name, child in node.items():
+                entry_id = len(self.paths)
+                self.paths.append(os.path.join(self.paths[parent_id], name))
+                self.children[parent_id].append(entry_id)
+                if _is_file_node(child):
+                    self.is_dir.append(False)
+                    self.children.append(())
+                    raw_deps.append(child.get('dependencies', ()))
+                else:
+                    self.is_dir.append(True)
+                    self.children.append([])
+                    raw_deps.append(())
+                    stack.append((entry_id, child))
+
+        self.ids = {path: entry_id for entry_id, path in enumerate(self.paths)}
+        self.by_basename = defaultdict(list)
+        for entry_id, path in enumerate(self.paths):
+            if not self.is_dir[entry_id]:
+                self.by_basename[os.path.basename(path)].append(entry_id)
+        self.deps = [self._dep_ids(deps) for deps in raw_deps]
+
+    def _dep_ids(self, deps):
+        """Map summary dependency strings to entry ids, skipping unknown paths"""
+        dep_ids = {}
+        for dep in deps:
+            if dep.startswith(_TERRAFORM_REF_PREFIXES):
+                continue
+            if dep.startswith('module:'):
+                dep = dep.split(':', 2)[2]
+            dep_id = self.ids.get(os.path.normpath(dep))
+            if dep_id is not None:
+                dep_ids[dep_id] = None
+        return tuple(dep_ids)
+
+
+def _file_mtimes(paths):
+    """Map each path to its st_mtime_ns, or None if it cannot be stat'ed"""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+def _disk_order(file_path):
+    """Sort key grouping paths by directory and then by inode number"""
+    try:
+        inode = os.stat(file_path).st_ino
+    except OSError:
+        inode = 0
+    return (os.path.dirname(file_path), inode)
+
+
+@lru_cache(maxsize=256)
+def _read_small_file(file_path, mtime_ns, size):
+    """Read and decode a file under _MMAP_THRESHOLD, memoized.
+
+    mtime_ns and size are only part of the cache key, so a file that changed
+    on disk misses the cache and is read again. Only small files are cached,
+    which bounds the cache at 256 files of under 64 KiB each.
+    """
+    with open(file_path, 'rb') as f:
+        if _HAS_FADVISE:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return f.read().decode('utf-8', 'replace')
+
+
+def _read_file(file_path, mtime_ns, size):
+    """Read a file and decode it as UTF-8, mapping large files instead of copying them.
+
+    Decoding is a single validating pass: invalid bytes become U+FFFD instead
+    of failing the whole read, so the agent still sees the rest of the file.
+    Small files come from _read_small_file's cache; large ones are decoded on
+    every call rather than kept alive for the life of the process.
+    """
+    if size < _MMAP_THRESHOLD:
+        return _read_small_file(file_path, mtime_ns, size)
+    with open(file_path, 'rb') as f:
+        if _HAS_FADVISE:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8', 'replace')
+
+
+# "File: <path>" header the coder agent puts before each file it edits, also
+# when written as markdown ("### File: path", "- File: path", "**File:** `path`")
+_FILE_HEADER_RE = re.compile(r'^[ \t#>*\-]*File:(?:\*\*)?[ \t]*`?([^\s`*]+)', re.MULTILINE)
+
+# Short requests that start with one of these verbs and name the concrete
+# value to set (change a CIDR "to 10.0.0.0/22", a region "to eu-west-2") are
+# mechanical edits that the lighter model handles reliably, unless they hint
+# at creating something or touching several files
+_LIGHT_MODEL = "gpt-4o-mini"
+_LIGHT_MODEL_MAX_WORDS = 40
+_MECHANICAL_EDIT_RE = re.compile(r'^\s*(?:please\s+)?(?:update|change|set|rename|replace|bump)\b', re.IGNORECASE)
+_TARGET_VALUE_RE = re.compile(r'\bto\s+(?:"[^"]+"|\'[^\']+\'|`[^`]+`|[\w./:-]*\d[\w./:-]*)', re.IGNORECASE)
+_COMPLEX_REQUEST_RE = re.compile(r'\b(?:refactor|design|restructure|migrate|architecture|explain|why)\b', re.IGNORECASE)
+_CREATION_RE = re.compile(r'\b(?:new|create|creates|creating|also|add|adds|set\s+up)\b', re.IGNORECASE)
+_MULTI_FILE_RE = re.compile(r'\b(?:all|every|each|across|everywhere|examples|files|modules)\b', re.IGNORECASE)
+
+
+def _pick_model(messages):
+    """Return the lighter model for a short mechanical edit request, else None.
+
+    Only the latest user message is classified; None keeps the agent's own
+    model for anything that looks open-ended, creates something new or spans
+    several files.
+    """
+    request = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), None)
+    if not isinstance(request, str) or len(request.split()) > _LIGHT_MODEL_MAX_WORDS:
+        return None
+    if not _MECHANICAL_EDIT_RE.match(request) or not _TARGET_VALUE_RE.search(request):
+        return None
+    if _COMPLEX_REQUEST_RE.search(request) or _CREATION_RE.search(request) or _MULTI_FILE_RE.search(request):
+        return None
+    return _LIGHT_MODEL
+
+
+# Tools that only read files, so several calls to them can run side by side
+_CONCURRENT_TOOLS = frozenset(['get_code_context', 'get_code_contexts'])
+_TOOL_CALL_POOL = ThreadPoolExecutor(max_workers=8)
+
+# Blocking file reads release the GIL, so get_code_contexts reads files in parallel
+_IO_POOL = ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 4))
+
+
+class _ConcurrentSwarm(Swarm):
+    """Swarm client that resolves a turn's read-only tool calls concurrently.
+
+    Swarm runs the tool calls from one model response one after another. When
+    the model asks for several files in the same turn the reads are independent,
+    so they are resolved on a thread pool and merged back in call order.
+    """
+
+    def handle_tool_calls(self, tool_calls, functions, context_variables, debug):
+        if len(tool_calls) < 2 or any(call.function.name not in _CONCURRENT_TOOLS for call in tool_calls):
+            return super().handle_tool_calls(tool_calls, functions, context_variables, debug)
+
+        handle_one = super().handle_tool_calls
+        partials = list(_TOOL_CALL_POOL.map(
+            lambda call: handle_one([call], functions, context_variables, debug),
+            tool_calls,
+        ))
+        merged = partials[0]
+        for partial in partials[1:]:
+            merged.messages.extend(partial.messages)
+            merged.context_variables.update(partial.context_variables)
+            merged.agent = partial.agent or merged.agent
+        return merged
+
+
+@lru_cache(maxsize=None)
+def _get_swarm():
+    """Swarm client shared by every Codebase, so they reuse one OpenAI connection pool"""
+    return _ConcurrentSwarm()
+
+
+# Instructions for the coder agent; {root} is replaced with the repository root
+_CODER_INSTRUCTIONS_TEMPLATE = """
+You are a Terraform code assistant. Your task is to analyze code change requests and implement them correctly.
+
+Important file path handling rules:
+1. All file paths must be prefixed with "{root}/"
+2. Always use forward slashes (/) in paths, even on Windows
+3. The repository root directory is: {root}
+4. All paths in get_code_context() must be absolute paths starting from {root}
+
+Follow these steps for each request:
+1. Analyze the request to identify which files need modification
+2. Use the repository structure in repo_json_summary to locate the exact files
+3. Construct the full file path by joining {root} with the relative path
+4. Use get_code_context() with the FULL path to read current code
+5. Make the requested changes while preserving the overall structure
+
+Example output format:
+File: {root}/path/to/file.tf
+```
+# Modified code here
+```
+
+Available tools:
+- get_code_context(file_path): Reads file content. MUST use full path from {root}
+- get_code_contexts(file_paths): Reads several files in one call. Pass the full paths from {root} as one string, one path per line. Prefer this when you need more than one file
+- Repository structure in repo_json_summary 
+- Overall context in repo_print_summary
+
+Focus on:
+1. Always using complete paths starting with {root}
+2. Making precise, targeted changes
+3. Maintaining existing code patterns
+"""
+
+
 class Codebase:
-    def __init__(self, repo_json_summary, repo_print_summary, repo_root_dir):
-        # Read repo print summary text file
-        with open(repo_print_summary, 'r') as f:
-            self.repo_print_summary = f.read()
-            
-        # Read repo json summary file
-        with open(repo_json_summary, 'r') as f:
-            self.repo_json_summary = json.load(f)
+    def __init__(self, repo_json_summary, repo_print_summary, repo_root_dir, response_cache="llm_response_cache"):
+        # Summaries are read lazily on first access
+        self._json_path = repo_json_summary
+        self._print_path = repo_print_summary
+        self._response_cache_path = response_cache
 
         self.repo_root_dir = repo_root_dir
-        self.client = Swarm()
+        self.client = _get_swarm()
         self.coder_agent = Agent(
             name="Coder Agent",
-            instructions=f"""
-                You are a Terraform code assistant. Your task is to analyze code change requests and implement them correctly.
-
-                Important file path handling rules:
-                1. All file paths must be prefixed with "{self.repo_root_dir}/"
-                2. Always use forward slashes (/) in paths, even on Windows
-                3. The repository root directory is: {self.repo_root_dir}
-                4. All paths in get_code_context() must be absolute paths starting from {self.repo_root_dir}
-
-                Follow these steps for each request:
-                1. Analyze the request to identify which files need modification
-                2. Use the repository structure in repo_json_summary to locate the exact files
-                3. Construct the full file path by joining {self.repo_root_dir} with the relative path
-                4. Use get_code_context() with the FULL path to read current code
-                5. Make the requested changes while preserving the overall structure
-
-                Example output format:
-                File: {self.repo_root_dir}/path/to/file.tf
-                ```
-                # Modified code here
-                ```
-
-                Available tools:
-                - get_code_context(file_path): Reads file content. MUST use full path from {self.repo_root_dir}
-                - Repository structure in repo_json_summary 
-                - Overall context in repo_print_summary
-
-                Focus on:
-                1. Always using complete paths starting with {self.repo_root_dir}
-                2. Making precise, targeted changes
-                3. Maintaining existing code patterns
-            """,
+            instructions=_CODER_INSTRUCTIONS_TEMPLATE.format(root=self.repo_root_dir),
             model="gpt-4o"
         )
         self.coder_agent.functions.append(self.get_code_context)
+        self.coder_agent.functions.append(self.get_code_contexts)
+
+    def run(self, messages):
+        """Run the coder agent on a conversation, reusing the reply to a repeated request.
+
+        Replies are stored in a shelve keyed by the agent instructions, the
+        conversation and the mtimes of the repo summaries, so re-summarizing
+        the repository invalidates every stored reply. Each reply also records
+        the mtimes of the repo files it edits, and is discarded if any of them
+        has changed since.
+
+        Args:
+            messages (list[dict]): Conversation history to send to the agent
+
+        Returns:
+            list[dict]: The messages the agent produced for this turn
+        """
+        key = self._response_cache_key(messages)
+        entry = None
+        try:
+            with _RESPONSE_CACHE_LOCK, shelve.open(self._response_cache_path) as cache:
+                entry = cache.get(key)
+        except _RESPONSE_CACHE_ERRORS as e:
+            log.warning("Ignoring unreadable response cache: %s", e)
+        if isinstance(entry, tuple):
+            reply_messages, file_mtimes = entry
+            if _file_mtimes(file_mtimes) == file_mtimes:
+                return reply_messages
+
+        response = self.client.run(
+            agent=self.coder_agent,
+            messages=messages,
+            model_override=_pick_model(messages),
+        )
+        reply = response.messages[-1].get("content") if response.messages else None
+        file_mtimes = _file_mtimes(self.referenced_files(reply or ""))
+        try:
+            with _RESPONSE_CACHE_LOCK, shelve.open(self._response_cache_path) as cache:
+                cache[key] = (response.messages, file_mtimes)
+        except _RESPONSE_CACHE_ERRORS as e:
+            log.warning("Error writing response cache: %s", e)
+        return response.messages
+
+    def referenced_files(self, text):
+        """Return the known repo files named in "File: <path>" headers in text.
+
+        The headers are found in one regex pass over text and each candidate
+        is checked against the file index in O(1), so the cost does not grow
+        with the number of files in the repository.
+        """
+        try:
+            index = self._file_index
+        except (OSError, ValueError):
+            return []
+        return [
+            path for path in dict.fromkeys(_FILE_HEADER_RE.findall(text))
+            if index.ids.get(os.path.normpath(path)) is not None
+        ]
+
+    def _response_cache_key(self, messages):
+        """Hash everything that determines the agent's reply to messages"""
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(_to_json(
+            [_pick_model(messages) or self.coder_agent.model, self.coder_agent.instructions, messages]
+        ).encode('utf-8'))
+        for path in (self._json_path, self._print_path):
+            try:
+                digest.update(str(os.stat(path).st_mtime_ns).encode('ascii'))
+            except OSError:
+                digest.update(b'-')
+        return digest.hexdigest()
+
+    @cached_property
+    def repo_print_summary(self):
+        """Repo print summary text, read on first access"""
+        with open(self._print_path, 'r') as f:
+            return f.read()
+
+    @cached_property
+    def repo_json_summary(self):
+        """Parsed repo json summary, loaded on first access.
+
+        The parsed dict is pickled to a sidecar ``.cache`` file keyed by the
+        summary's mtime and size, so later runs can skip JSON parsing until
+        the summary is regenerated.
+        """
+        stat = os.stat(self._json_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cache_path = self._json_path + ".cache"
+        try:
+            with open(cache_path, 'rb') as f:
+                if pickle.load(f) == key:
+                    return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning("Ignoring unreadable summary cache: %s", e)
+
+        with open(self._json_path, 'rb') as f:
+            summary = _intern_strings(orjson.loads(f.read()))
+
+        # Write to a temp file and rename so readers never see a partial cache
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(summary, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            log.warning("Error writing summary cache: %s", e)
+        return summary
 
     def get_code_context(self, file_path):
         """Get code from files for context.
@@ -68,28 +423,109 @@ class Codebase:
         Returns:
             str: The extracted code from the file
         """
-        print(f"Getting code context for file: {file_path}")
+        log.debug("Getting code context for file: %s", file_path)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                code = ''.join(lines)
-                
+            stat = os.stat(file_path)
+            code = _read_file(file_path, stat.st_mtime_ns, stat.st_size)
+            self._prefetch_dependencies(file_path)
             return code
             
         except FileNotFoundError:
-            print(f"Error: File {file_path} not found")
+            log.debug("Error: File %s not found", file_path)
+            suggestions = self._similar_paths(file_path)
+            if suggestions:
+                return f"Error: File {file_path} not found. Did you mean: {', '.join(suggestions)}"
             return f"Error: File {file_path} not found"
         except Exception as e:
-            print(f"Error reading file: {str(e)}")
+            log.debug("Error reading file: %s", e)
             return f"Error reading file: {str(e)}"
 
+    @cached_property
+    def _file_index(self):
+        """Flat index of the summary structure, built on first use"""
+        return _FileIndex(self.repo_json_summary.get('structure', {}), self.repo_root_dir)
+
+    def _similar_paths(self, file_path, limit=5):
+        """Known repo files with the same file name as file_path, closest paths first"""
+        try:
+            index = self._file_index
+        except (OSError, ValueError):
+            return []
+        file_path = os.path.normpath(file_path)
+        file_ids = index.by_basename.get(os.path.basename(file_path), ())
+        # Every example has its own main.tf, so rank by how close the whole path is
+        return difflib.get_close_matches(file_path, [index.paths[file_id] for file_id in file_ids], n=limit, cutoff=0)
+
+    def _prefetch_dependencies(self, file_path):
+        """Hint the kernel to start reading the files that file_path depends on.
+
+        The agent usually asks for a file's dependencies right after the file
+        itself, so issuing POSIX_FADV_WILLNEED now lets the page cache fill while
+        the model is still working on its next step.
+        """
+        if not _HAS_FADVISE:
+            return
+        try:
+            index = self._file_index
+            file_id = index.ids.get(os.path.normpath(file_path))
+            if file_id is None:
+                return
+
+            prefetch_paths = []
+            for dep_id in index.deps[file_id]:
+                if index.is_dir[dep_id]:
+                    # Module directory: prefetch the .tf files directly inside it
+                    prefetch_paths.extend(
+                        index.paths[child_id]
+                        for child_id in index.children[dep_id]
+                        if not index.is_dir[child_id] and index.paths[child_id].endswith('.tf')
+                    )
+                else:
+                    prefetch_paths.append(index.paths[dep_id])
+
+            for path in dict.fromkeys(prefetch_paths):
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+        except (OSError, ValueError) as e:
+            log.debug("Error prefetching dependencies: %s", e)
+
+    def get_code_contexts(self, file_paths):
+        """Get code from several files for context in a single tool call.
+
+        Batched form of get_code_context. Fetching all the files the agent needs
+        in one call saves a model round trip per additional file.
+
+        Args:
+            file_paths (str): Absolute paths to the files, separated by newlines or commas
+
+        Returns:
+            str: The code of each file, prefixed with its path
+        """
+        # Swarm advertises unannotated parameters as strings, so the model sends
+        # the paths as one string; a list is still accepted from direct callers
+        if isinstance(file_paths, str):
+            file_paths = [path.strip() for path in re.split(r'[\n,]', file_paths) if path.strip()]
+
+        # Read each distinct file once on the I/O pool, submitted grouped by
+        # directory and in inode order so a burst of small files from one
+        # module directory is fetched in roughly on-disk order
+        unique_paths = sorted(dict.fromkeys(file_paths), key=_disk_order)
+        contexts = dict(zip(unique_paths, _IO_POOL.map(self.get_code_context, unique_paths)))
+        return '\n\n'.join(
+            f"File: {file_path}\n```\n{contexts[file_path]}\n```"
+            for file_path in file_paths
+        )
+
 def main():
     # Update the region in the simple example from eu-west-1 to asia-south-1
     # Update the vpc_cidr in the outpost example to 10.0.0.0/22
     codebase = Codebase("repo_json_summary.json","repo_print_summary.txt", "terraform-aws-vpc")
     messages = [{"role": "user", "content": "Update the vpc_cidr in the outpost example to 10.0.0.0/22"}]
-    response = codebase.client.run(agent=codebase.coder_agent, messages=messages)
-    print(response.messages[-1]["content"])
+    response_messages = codebase.run(messages)
+    print(response_messages[-1]["content"])
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,172 @@
 import os
 import re
 import argparse
+import shutil
 import subprocess
 import json
-from collections import defaultdict
-import networkx as nx
+import heapq
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-import matplotlib.pyplot as plt
+from xml.sax.saxutils import escape
+
+# Source files are read and matched as bytes; only the captured names are decoded
+_READ_BUFFER_SIZE = 128 * 1024
+
+# Source files larger than this are taken to be generated or bundled and
+# aren't scanned for dependencies, nor are files with a NUL byte in their
+# first _BINARY_SNIFF_SIZE bytes
+_MAX_SCAN_FILE_SIZE = 2 * 1024 * 1024
+_BINARY_SNIFF_SIZE = 512
+
+# Output buffer for the generated summary files
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Repositories with at least this many source files are scanned on a process
+# pool; below it, starting the workers costs more than it saves
+_PARALLEL_SCAN_MIN_FILES = 512
+
+# Terraform block patterns, compiled once at import. They stay separate
+# passes: each starts with a literal, so re can jump between occurrences of
+# it, while a combined alternation is tried at every byte and measured
+# slower. Separate passes also let var. references inside module bodies match
+_TF_MODULE_RE = re.compile(rb'module\s+\"([^\"]+)\"\s+{([^}]+)}', re.DOTALL)
+_TF_SOURCE_RE = re.compile(rb'source\s*=\s*\"([^\"]+)\"')
+_TF_RESOURCE_RE = re.compile(rb'resource\s+\"([^\"]+)\"\s+\"([^\"]+)\"\s+{')
+_TF_DATA_RE = re.compile(rb'data\s+\"([^\"]+)\"\s+\"([^\"]+)\"\s+{')
+_TF_VAR_RE = re.compile(rb'var\.([a-zA-Z0-9_-]+)')
+
+# Extensions import resolution tries, in order of preference; a package
+# (__init__.py or index.js) ranks just after the module file of its language
+_RESOLVE_EXTENSIONS = ['.py', '.js', '.tsx', '.jsx', '.ts', '.java', '.go', '.tf']
+_MODULE_RANKS = {ext: 2 * i for i, ext in enumerate(_RESOLVE_EXTENSIONS)}
+_PACKAGE_RANKS = {'__init__.py': _MODULE_RANKS['.py'] + 1, 'index.js': _MODULE_RANKS['.js'] + 1}
+
+# Literals that every import pattern match for a language must contain; files
+# containing none of them cannot match, so the regexes are skipped entirely
+_LANG_LITERALS = {
+    'python': (b'import', b'from'),
+    'javascript': (b'import', b'require', b'from'),
+    'java': (b'import',),
+    'go': (b'import',),
+    'terraform': (b'source', b'module'),
+}
+
+
+def _is_file_node(value):
+    """Whether a file_structure value is a file rather than a directory.
+
+    Files are stored as {} or {"dependencies": [...]}, while directories are
+    never empty and map names to dicts, so this is an O(1) check that also
+    handles a directory containing a file named "dependencies".
+    """
+    return not value or isinstance(value.get("dependencies"), list)
+
+
+def _decode(token):
+    """Decode a captured token from a source file"""
+    return token.decode('utf-8', 'replace')
+
+
+def _scan_terraform(content):
+    """Extract (name, source) module pairs and resource/data/var references from Terraform source"""
+    modules = []
+    refs = []
+
+    # Find module blocks (each search below is skipped if its keyword never appears)
+    module_blocks = _TF_MODULE_RE.findall(content) if b'module' in content else []
+    for module_name, module_content in module_blocks:
+        # Extract source attribute
+        source_match = _TF_SOURCE_RE.search(module_content)
+        if source_match:
+            modules.append((_decode(module_name), _decode(source_match.group(1))))
+
+    # Find resource blocks
+    resource_blocks = _TF_RESOURCE_RE.findall(content) if b'resource' in content else []
+    for resource_type, resource_name in resource_blocks:
+        refs.append(f"resource:{_decode(resource_type)}:{_decode(resource_name)}")
+
+    # Find data blocks
+    data_blocks = _TF_DATA_RE.findall(content) if b'data' in content else []
+    for data_type, data_name in data_blocks:
+        refs.append(f"data:{_decode(data_type)}:{_decode(data_name)}")
+
+    # Find variable references
+    var_refs = _TF_VAR_RE.findall(content) if b'var.' in content else []
+    for var_name in var_refs:
+        refs.append(f"var:{_decode(var_name)}")
+
+    return modules, refs
+
+
+# Compiled import patterns by language for _scan_one_file; installed once per
+# scan by _init_scan_worker, in each worker process when scanning in parallel,
+# so the patterns aren't pickled along with every file
+_import_patterns = {}
+
+
+def _init_scan_worker(import_patterns):
+    """Install the compiled import patterns _scan_one_file matches with"""
+    _import_patterns.clear()
+    _import_patterns.update(import_patterns)
+
+
+def _scan_one_file(file_path, language):
+    """Read one source file and extract its raw dependency references.
+
+    Defined at module level so it can run in a worker process. Returns
+    (imports, modules, refs): import targets and (name, source) module pairs,
+    both still to be resolved against the repository, and Terraform
+    resource/data/var references. Returns None if the file can't be read or
+    is skipped as too large or binary.
+    """
+    try:
+        with open(file_path, 'rb', buffering=_READ_BUFFER_SIZE) as f:
+            if os.fstat(f.fileno()).st_size > _MAX_SCAN_FILE_SIZE:
+                return None
+            head = f.read(_BINARY_SNIFF_SIZE)
+            if b'\x00' in head:
+                return None
+            content = head + f.read()
+    except IOError:
+        return None
+
+    # Only run the regexes if a required literal appears at all
+    imports = []
+    literals = _LANG_LITERALS.get(language)
+    if literals is None or any(literal in content for literal in literals):
+        for pattern in _import_patterns.get(language, ()):
+            imports.extend(_decode(match) for match in pattern.findall(content))
+
+    # Special handling for Terraform files
+    if language == 'terraform':
+        modules, refs = _scan_terraform(content)
+    else:
+        modules, refs = [], []
+    return imports, modules, refs
 
 class GitHubRepoAnalyzer:
     def __init__(self, repo_url=None, local_path=None):
         self.repo_url = repo_url
         self.local_path = local_path
-        self.file_structure = {}
+        # The tree is stored flat: one (name, parent_idx, is_dir, deps) tuple
+        # per file or directory, parents before children, parent_idx -1 for
+        # top-level entries and deps None unless a file has dependencies
+        self.nodes = []
+        self._path_to_idx = {'': -1}
+        self._file_structure = None
+        self._sorted_children = None
+        self._summary_cache = None
         self.dependencies = defaultdict(list)
+        self._ext_counts = {}
+        self._file_count = 0
+        self._dir_count = 0
+        self._all_files = set()
+        self._all_dirs = set()
+        self._resolve_cache = {}
+        self._module_index = {}
+        self._package_index = {}
         self.ignored_dirs = ['.git', 'node_modules', '__pycache__', 'venv', '.env', '.venv']
         self.language_patterns = {
             'python': {
@@ -52,6 +205,13 @@ class GitHubRepoAnalyzer:
                 ]
             }
         }
+
+        # Reverse map for language detection; the first language listing an
+        # extension wins, as with a scan over language_patterns
+        self._ext_to_lang = {}
+        for lang, patterns in self.language_patterns.items():
+            for ext in patterns['files']:
+                self._ext_to_lang.setdefault(ext, lang)
         
     def clone_repo(self, target_dir=None):
         """Clone the repository to local path"""
@@ -74,197 +234,253 @@ class GitHubRepoAnalyzer:
             return False
             
         print(f"Analyzing repository at {self.local_path}...")
-        self._analyze_dependencies()  # Analyze dependencies first
-        self._build_file_structure()  # Then build file structure with dependencies
+        self._single_pass_scan()
         return True
-        
-    def _build_file_structure(self):
-        """Build a dictionary representing the file structure with dependencies included"""
-        self.file_structure = {}
-        
-        # Helper function to set a value in a nested dictionary
-        def set_nested_dict(d, path, key, value):
-            current = d
-            for part in path:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-            current[key] = value
-        
-        # Walk through all files
-        for root, dirs, files in os.walk(self.local_path):
-            # Skip ignored directories
-            dirs[:] = [d for d in dirs if d not in self.ignored_dirs and not d.startswith('.')]
-            
-            # Get relative path
-            rel_path = os.path.relpath(root, self.local_path)
-            path_parts = [] if rel_path == '.' else rel_path.split(os.sep)
-            
-            # Add files at this level with their dependencies
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_file_path = os.path.relpath(file_path, self.local_path)
-                
-                # Include dependencies if they exist
-                file_deps = self.dependencies.get(rel_file_path, [])
-                if file_deps:
-                    file_data = {"dependencies": file_deps}
-                    set_nested_dict(self.file_structure, path_parts, file, file_data)
+
+    def _iter_files(self):
+        """Yield (path, rel_path, name, ext) for every file in the repository.
+
+        Uses os.scandir, whose entries already know their type, so no extra stat
+        is needed per entry. Ignored and hidden directories are pruned before
+        descending, and files come out in the same top-down order as os.walk.
+        Relative paths are built by appending to each directory's prefix
+        rather than with os.path.relpath per file.
+        """
+        ignored_dirs = frozenset(self.ignored_dirs)
+        stack = [(self.local_path, '')]
+        while stack:
+            root, rel_root = stack.pop()
+            try:
+                with os.scandir(root) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir():
+                    # Like os.walk, don't follow symlinked directories
+                    if not entry.is_symlink() and entry.name not in ignored_dirs and not entry.name.startswith('.'):
+                        subdirs.append((entry.path, rel_root + entry.name + os.sep))
                 else:
-                    # If no dependencies, store as empty object instead of null
-                    set_nested_dict(self.file_structure, path_parts, file, {})
-                
+                    yield entry.path, rel_root + entry.name, entry.name, os.path.splitext(entry.name)[1].lower()
+            stack.extend(reversed(subdirs))
+
+    def _single_pass_scan(self):
+        """Analyze dependencies, build the file structure and count file types in one walk"""
+        self.nodes = []
+        self._path_to_idx = {'': -1}
+        self._file_structure = None
+        self._sorted_children = None
+        self._summary_cache = None
+        self.dependencies = defaultdict(list)
+        self._ext_counts = {}
+        self._file_count = 0
+        self._dir_count = 0
+
+        # Compile import patterns once per scan rather than per file, as bytes
+        # patterns so file contents never need decoding
+        self._compiled_import_patterns = {
+            lang: [re.compile(pattern.encode('utf-8')) for pattern in patterns['import_patterns']]
+            for lang, patterns in self.language_patterns.items()
+        }
+
+        # Helper function to find a directory's node, creating it and any
+        # missing parents the first time it is seen
+        def dir_index(rel_dir):
+            idx = self._path_to_idx.get(rel_dir)
+            if idx is None:
+                parent_dir, name = os.path.split(rel_dir)
+                parent_idx = dir_index(parent_dir)
+                idx = len(self.nodes)
+                self.nodes.append((name, parent_idx, True, None))
+                self._path_to_idx[rel_dir] = idx
+                self._dir_count += 1
+            return idx
+
+        # List the tree first so import resolution can check the complete set
+        # of repository paths in memory instead of stat'ing candidates
+        files = list(self._iter_files())
+        root = os.path.normpath(self.local_path)
+        self._all_files = {os.path.normpath(file_path) for file_path, _, _, _ in files}
+        self._all_dirs = {root}
+        for path in self._all_files:
+            parent = os.path.dirname(path)
+            while parent and parent not in self._all_dirs:
+                self._all_dirs.add(parent)
+                parent = os.path.dirname(parent)
+        self._build_stem_index()
+        self._resolve_cache = {}
+
+        # Read and regex-scan the source files, then resolve what they reference
+        jobs = []
+        job_paths = []
+        for file_path, rel_file_path, file, ext in files:
+            language = self._ext_to_lang.get(ext)
+            if language:
+                jobs.append((file_path, language))
+                job_paths.append(rel_file_path)
+        for rel_file_path, result in zip(job_paths, self._scan_files(jobs)):
+            if result is not None:
+                self._record_dependencies(rel_file_path, *result)
+
+        for file_path, rel_file_path, file, ext in files:
+            self._file_count += 1
+            if ext:
+                self._ext_counts[ext] = self._ext_counts.get(ext, 0) + 1
+
+            # Include dependencies if they exist
+            parent_idx = dir_index(os.path.dirname(rel_file_path))
+            file_deps = self.dependencies.get(rel_file_path) or None
+            self.nodes.append((file, parent_idx, False, file_deps))
+
+    @property
+    def file_structure(self):
+        """The repository tree as nested dicts, built from self.nodes on first use"""
+        if self._file_structure is None:
+            structure = {}
+            values = []
+            for name, parent_idx, is_dir, deps in self.nodes:
+                # Files without dependencies are stored as empty objects instead of null
+                value = {"dependencies": deps} if deps else {}
+                (structure if parent_idx < 0 else values[parent_idx])[name] = value
+                values.append(value)
+            self._file_structure = structure
+        return self._file_structure
+
+    def _node_paths(self):
+        """Relative path of every node, in node order"""
+        paths = []
+        for name, parent_idx, _, _ in self.nodes:
+            paths.append(name if parent_idx < 0 else paths[parent_idx] + os.sep + name)
+        return paths
+
+    def _child_indices(self):
+        """Node indices of the top-level entries and of each node's children, sorted by name.
+
+        Sorted once per scan and kept, so repeated summaries don't re-sort
+        every directory.
+        """
+        if self._sorted_children is None:
+            top = []
+            children = [[] for _ in self.nodes]
+            for idx, (_, parent_idx, _, _) in enumerate(self.nodes):
+                (top if parent_idx < 0 else children[parent_idx]).append(idx)
+
+            def name_of(idx):
+                return self.nodes[idx][0]
+
+            top.sort(key=name_of)
+            for indices in children:
+                if len(indices) > 1:
+                    indices.sort(key=name_of)
+            self._sorted_children = (top, children)
+        return self._sorted_children
+
     def _get_language_from_extension(self, filename):
         """Determine the language based on file extension"""
         extension = os.path.splitext(filename)[1].lower()
-        for lang, patterns in self.language_patterns.items():
-            if extension in patterns['files']:
-                return lang
-        return None
-        
-    def _analyze_dependencies(self):
-        """Analyze dependencies between files"""
-        self.dependencies = defaultdict(list)
-        
-        # Walk through all files
-        for root, dirs, files in os.walk(self.local_path):
-            # Skip ignored directories
-            if any(ignored in root for ignored in self.ignored_dirs):
-                continue
-                
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, self.local_path)
-                
-                # Determine language
-                language = self._get_language_from_extension(file)
-                if not language:
-                    continue
-                    
-                # Get import patterns for the language
-                import_patterns = self.language_patterns[language]['import_patterns']
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                    for pattern in import_patterns:
-                        matches = re.findall(pattern, content)
-                        for match in matches:
-                            # Resolve to absolute path
-                            resolved_path = self._resolve_absolute_import(rel_path, match)
-                            if resolved_path:
-                                # Store absolute path if resolved
-                                self.dependencies[rel_path].append(resolved_path)
-                except (UnicodeDecodeError, IOError):
-                    # Skip binary or unreadable files
-                    continue
-                    
-                # Special handling for Terraform files
-                if language == 'terraform':
-                    self._analyze_terraform_dependencies(file_path, rel_path, content)
-    
-    def _analyze_terraform_dependencies(self, file_path, rel_path, content):
-        """Analyze Terraform-specific dependencies"""
-        # Find module blocks
-        module_blocks = re.findall(r'module\s+\"([^\"]+)\"\s+{([^}]+)}', content, re.DOTALL)
-        for module_name, module_content in module_blocks:
-            # Extract source attribute
-            source_match = re.search(r'source\s*=\s*\"([^\"]+)\"', module_content)
-            if source_match:
-                module_source = source_match.group(1)
-                
-                # Resolve module path to absolute path
-                resolved_module_path = self._resolve_absolute_import(rel_path, module_source)
-                
-                if resolved_module_path:
-                    # Store module dependency with resolved absolute path
-                    module_dependency = f"module:{module_name}:{resolved_module_path}"
-                    self.dependencies[rel_path].append(module_dependency)
-                
-        # Find resource blocks
-        resource_blocks = re.findall(r'resource\s+\"([^\"]+)\"\s+\"([^\"]+)\"\s+{', content)
-        for resource_type, resource_name in resource_blocks:
-            # Keep as-is since these are internal resource references
-            self.dependencies[rel_path].append(f"resource:{resource_type}:{resource_name}")
-            
-        # Find data blocks
-        data_blocks = re.findall(r'data\s+\"([^\"]+)\"\s+\"([^\"]+)\"\s+{', content)
-        for data_type, data_name in data_blocks:
-            # Keep as-is since these are internal data source references
-            self.dependencies[rel_path].append(f"data:{data_type}:{data_name}")
-            
-        # Find variable references
-        var_refs = re.findall(r'var\.([a-zA-Z0-9_-]+)', content)
-        for var_name in var_refs:
-            # Keep as-is since these are internal variable references
-            self.dependencies[rel_path].append(f"var:{var_name}")
-    
+        return self._ext_to_lang.get(extension)
+        
+    def _scan_files(self, jobs):
+        """Run _scan_one_file over (file_path, language) jobs, in parallel for large repositories"""
+        if len(jobs) >= _PARALLEL_SCAN_MIN_FILES:
+            try:
+                with ProcessPoolExecutor(initializer=_init_scan_worker, initargs=(self._compiled_import_patterns,)) as executor:
+                    return list(executor.map(_scan_one_file, *zip(*jobs), chunksize=64))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel scan unavailable, scanning sequentially: {e}")
+        _init_scan_worker(self._compiled_import_patterns)
+        return [_scan_one_file(*job) for job in jobs]
+
+    def _record_dependencies(self, rel_path, imports, modules, refs):
+        """Resolve a scanned file's references and record them as its dependencies"""
+        for import_name in imports:
+            # Resolve to absolute path
+            resolved_path = self._resolve_absolute_import(rel_path, import_name)
+            if resolved_path:
+                # Store absolute path if resolved
+                self.dependencies[rel_path].append(resolved_path)
+
+        for module_name, module_source in modules:
+            # Resolve module path to absolute path
+            resolved_module_path = self._resolve_absolute_import(rel_path, module_source)
+            if resolved_module_path:
+                # Store module dependency with resolved absolute path
+                self.dependencies[rel_path].append(f"module:{module_name}:{resolved_module_path}")
+
+        # Resource, data and variable references are kept as-is
+        if refs:
+            self.dependencies[rel_path].extend(refs)
+
     def generate_summary(self):
-        """Generate a summary of the repository"""
-        summary = {
-            "file_count": self._count_files(self.file_structure),
-            "directory_count": self._count_directories(self.file_structure),
-            "file_types": self._count_file_types(),
-            "structure": self.file_structure
-            # Dependencies are now integrated into the structure
-        }
-        return summary
-        
-    def _count_files(self, structure):
-        """Count the total number of files in the structure"""
-        count = 0
-        for key, value in structure.items():
-            if isinstance(value, dict) and not any(k for k in value.keys() if isinstance(value[k], dict)):
-                # It's a file if it has no nested dictionaries other than possibly dependencies
-                count += 1
-            else:  # Directory
-                count += self._count_files(value)
-        return count
-        
-    def _count_directories(self, structure):
-        """Count the total number of directories in the structure"""
-        count = 0
-        for key, value in structure.items():
-            if isinstance(value, dict) and any(k for k in value.keys() if isinstance(value[k], dict)):
-                # It's a directory if it has nested dictionaries
-                count += 1
-                count += self._count_directories(value)
-        return count
+        """Generate a summary of the repository, once per analysis"""
+        # print_summary and export_summary both ask for it; analyze_repo resets it
+        if self._summary_cache is None:
+            self._summary_cache = {
+                "file_count": self._file_count,
+                "directory_count": self._dir_count,
+                "file_types": self._count_file_types(),
+                "structure": self.file_structure
+                # Dependencies are now integrated into the structure
+            }
+        return self._summary_cache
         
     def _count_file_types(self):
         """Count the occurrences of each file extension"""
-        extensions = {}
-        
-        for root, dirs, files in os.walk(self.local_path):
-            if any(ignored in root for ignored in self.ignored_dirs):
-                continue
-                
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext:
-                    extensions[ext] = extensions.get(ext, 0) + 1
-                    
-        return extensions
+        # Counted during the repository scan
+        return dict(self._ext_counts)
         
+    def visualize_structure_svg(self, output_file="repo_structure.svg"):
+        """Visualize the repository structure as an SVG tree diagram"""
+        box_width, box_height, x_gap, y_gap = 120, 24, 20, 40
+
+        # Same layout as visualize_structure: one row per depth, each entry
+        # placed next in its row. Nodes are in tree order, so every row comes
+        # out in the same left-to-right order as the breadth-first layout
+        depths = []
+        positions = []
+        row_counts = defaultdict(int)
+        for name, parent_idx, _, _ in self.nodes:
+            depth = 0 if parent_idx < 0 else depths[parent_idx] + 1
+            depths.append(depth)
+            positions.append((row_counts[depth] * (box_width + x_gap), depth * (box_height + y_gap)))
+            row_counts[depth] += 1
+
+        width = max(row_counts.values(), default=0) * (box_width + x_gap)
+        height = len(row_counts) * (box_height + y_gap)
+        with open(output_file, 'w', buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="10">\n')
+
+            # Edges first, so the boxes are drawn over them
+            for (_, parent_idx, _, _), (x, y) in zip(self.nodes, positions):
+                if parent_idx >= 0:
+                    parent_x, parent_y = positions[parent_idx]
+                    f.write(f'<line x1="{parent_x + box_width // 2}" y1="{parent_y + box_height}" x2="{x + box_width // 2}" y2="{y}" stroke="#999"/>\n')
+
+            for (name, _, is_dir, _), (x, y) in zip(self.nodes, positions):
+                fill = "skyblue" if is_dir else "#e0f0f8"
+                f.write(f'<rect x="{x}" y="{y}" width="{box_width}" height="{box_height}" rx="4" fill="{fill}"/>')
+                f.write(f'<text x="{x + box_width // 2}" y="{y + 16}" text-anchor="middle">{escape(name)}</text>\n')
+
+            f.write('</svg>\n')
+
+        print(f"Structure visualization saved to {output_file}")
+
     def visualize_structure(self, output_file="repo_structure.png"):
-        """Visualize the repository structure as a tree diagram"""
+        """Visualize the repository structure as a tree diagram with matplotlib"""
+        # Imported here since they take a while to load and are only needed for plotting
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         G = nx.DiGraph()
-        
-        def add_nodes(structure, parent=None, path=""):
-            for key, value in structure.items():
-                current_path = os.path.join(path, key)
-                if parent is None:  # Root node
-                    G.add_node(current_path, label=key)
-                else:
-                    G.add_node(current_path, label=key)
-                    G.add_edge(parent, current_path)
-                    
-                if isinstance(value, dict) and any(isinstance(value[k], dict) for k in value.keys()):
-                    # It's a directory, continue recursion
-                    add_nodes(value, current_path, current_path)
-        
-        add_nodes(self.file_structure)
+
+        # Parents come before their children, so one pass adds every edge
+        paths = self._node_paths()
+        for (name, parent_idx, _, _), current_path in zip(self.nodes, paths):
+            G.add_node(current_path, label=name)
+            if parent_idx >= 0:
+                G.add_edge(paths[parent_idx], current_path)
         
         # Use a custom hierarchical layout instead of graphviz
         pos = self._custom_hierarchical_layout(G)
@@ -289,90 +505,68 @@ class GitHubRepoAnalyzer:
         """Create a custom hierarchical layout for the graph"""
         # Identify root nodes (no incoming edges)
         root_nodes = [n for n in G.nodes() if G.in_degree(n) == 0]
-        
-        # Calculate positions
+
+        # Breadth-first walk from the roots, grouping nodes by depth
+        levels = defaultdict(list)
+        seen = set(root_nodes)
+        queue = deque((root, 0) for root in root_nodes)
+        while queue:
+            node, depth = queue.popleft()
+            levels[depth].append(node)
+            for child in G.successors(node):
+                if child not in seen:
+                    seen.add(child)
+                    queue.append((child, depth + 1))
+
+        # Spread each level left to right, top-down
         pos = {}
-        max_depth = 0
-        node_widths = defaultdict(int)
-        
-        # First pass: calculate depths and widths
-        def calculate_metrics(node, depth=0):
-            nonlocal max_depth
-            max_depth = max(max_depth, depth)
-            
-            children = list(G.successors(node))
-            if not children:
-                node_widths[depth] += 1
-                return 1
-                
-            width = 0
-            for child in children:
-                width += calculate_metrics(child, depth + 1)
-                
-            node_widths[depth] += 1
-            return width
-            
-        total_width = 0
-        for root in root_nodes:
-            total_width += calculate_metrics(root)
-            
-        # Second pass: assign positions
-        width_used = defaultdict(int)
-        
-        def assign_positions(node, depth=0, x_offset=0):
-            children = list(G.successors(node))
-            
-            # Position for this node
-            x_pos = x_offset + width_used[depth]
-            width_used[depth] += 1
-            pos[node] = (x_pos, -depth)  # Negative to go top-down
-            
-            # Position children
-            if children:
-                for child in children:
-                    assign_positions(child, depth + 1, x_offset)
-                    
-        for root in root_nodes:
-            assign_positions(root)
-            
+        for depth, level_nodes in levels.items():
+            for i, node in enumerate(level_nodes):
+                pos[node] = (i, -depth)  # Negative to go top-down
+
         return pos
-        
+
     def visualize_dependencies(self, output_file="dependencies.png"):
         """Visualize dependencies between files"""
-        G = nx.DiGraph()
-        
-        # Build dependency graph from file structure
-        def extract_dependencies(structure, path=""):
-            for key, value in structure.items():
-                current_path = os.path.join(path, key)
-                
-                # Check if it's a file with dependencies
-                if isinstance(value, dict) and "dependencies" in value:
-                    G.add_node(current_path)
-                    for dep in value["dependencies"]:
-                        # Skip special Terraform dependencies for visualization clarity
-                        if dep.startswith('module:') or dep.startswith('resource:') or dep.startswith('data:') or dep.startswith('var:'):
-                            continue
-                        
-                        # Use the resolved absolute path
-                        if os.path.exists(dep):
-                            G.add_node(dep)
-                            G.add_edge(current_path, dep)
-                
-                # Recurse into directories
-                elif isinstance(value, dict) and any(isinstance(value[k], dict) for k in value.keys()):
-                    extract_dependencies(value, current_path)
-        
-        extract_dependencies(self.file_structure)
-        
-        if len(G) > 50:  # If too many nodes, skip visualization
-            print("Too many dependencies to visualize clearly.")
+        # Collect the graph first, so the plotting libraries are only loaded
+        # when there is something for them to draw
+        nodes = {}
+        edges = []
+
+        # Build dependency graph from the files that have dependencies
+        for (_, _, _, deps), current_path in zip(self.nodes, self._node_paths()):
+            if not deps:
+                continue
+            nodes[current_path] = None
+            for dep in deps:
+                # Skip special Terraform dependencies for visualization clarity
+                if dep.startswith('module:') or dep.startswith('resource:') or dep.startswith('data:') or dep.startswith('var:'):
+                    continue
+
+                # Use the resolved absolute path; it was resolved against the
+                # scanned paths, so check those rather than the filesystem
+                if dep in self._all_files or dep in self._all_dirs:
+                    nodes[dep] = None
+                    edges.append((current_path, dep))
+
+        if len(nodes) > 50:  # If too many nodes, only graphviz can lay them out clearly
+            if shutil.which('dot'):
+                self._render_with_graphviz(nodes, edges, output_file)
+            else:
+                print("Too many dependencies to visualize clearly.")
             return
-            
-        if len(G) == 0:  # No dependencies to visualize
+
+        if len(nodes) == 0:  # No dependencies to visualize
             print("No dependencies found to visualize.")
             return
-            
+
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
+        G = nx.DiGraph()
+        G.add_nodes_from(nodes)
+        G.add_edges_from(edges)
+
         plt.figure(figsize=(15, 10))
         
         # Use force-directed layout
@@ -390,19 +584,64 @@ class GitHubRepoAnalyzer:
         plt.savefig(output_file, bbox_inches='tight')
         plt.close()
         print(f"Dependency visualization saved to {output_file}")
-        
+
+    def _render_with_graphviz(self, nodes, edges, output_file):
+        """Render a dependency graph with graphviz's dot, in the format given by output_file's extension"""
+        def quote(text):
+            return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+        lines = ['digraph dependencies {', '  node [shape=box, fontsize=8];']
+        lines.extend(f'  {quote(node)} [label={quote(os.path.basename(node))}];' for node in nodes)
+        lines.extend(f'  {quote(source)} -> {quote(target)};' for source, target in edges)
+        lines.append('}')
+
+        output_format = os.path.splitext(output_file)[1].lstrip('.') or 'png'
+        try:
+            subprocess.run(['dot', f'-T{output_format}', '-o', output_file], input='\n'.join(lines).encode('utf-8'), check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Error rendering dependencies with graphviz: {e}")
+            return
+        print(f"Dependency visualization saved to {output_file}")
+
+    def _build_stem_index(self):
+        """Index the scanned files by the extensionless path an import would name.
+
+        _module_index maps "dir/name" to the preferred (rank, path) among
+        dir/name.py, dir/name.js, ...; _package_index maps "dir/name" to
+        dir/name/__init__.py or dir/name/index.js.
+        """
+        def keep_best(index, stem, rank, path):
+            best = index.get(stem)
+            if best is None or rank < best[0]:
+                index[stem] = (rank, path)
+
+        self._module_index = {}
+        self._package_index = {}
+        for path in self._all_files:
+            stem, ext = os.path.splitext(path)
+            if ext in _MODULE_RANKS:
+                keep_best(self._module_index, stem, _MODULE_RANKS[ext], path)
+            package_dir, name = os.path.split(path)
+            if name in _PACKAGE_RANKS:
+                keep_best(self._package_index, package_dir or os.curdir, _PACKAGE_RANKS[name], path)
+
     def _resolve_absolute_import(self, source_file, import_name):
         """Resolve an import to an absolute file path"""
         # Normalize source file path 
         source_file = os.path.normpath(os.path.join(self.local_path, source_file))
         source_dir = os.path.dirname(source_file)
-        
+
+        # Resolution only depends on the importing directory and the import
+        key = (source_dir, import_name)
+        if key not in self._resolve_cache:
+            self._resolve_cache[key] = self._resolve_uncached(source_dir, import_name)
+        return self._resolve_cache[key]
+
+    def _resolve_uncached(self, source_dir, import_name):
+        """Resolve an import from source_dir against the scanned repository paths"""
         # Replace dots with directory separators
         relative_path = import_name.replace('.', os.sep)
         
-        # Check common file extensions
-        possible_extensions = ['.py', '.js', '.tsx', '.jsx', '.ts', '.java', '.go', '.tf']
-        
         # Search strategies for resolution
         search_paths = [
             # 1. First try the direct path from the source directory
@@ -412,24 +651,22 @@ class GitHubRepoAnalyzer:
         ]
         
         for base_path in search_paths:
-            for ext in possible_extensions:
-                # Direct file import
-                potential_path = base_path + ext
-                if os.path.exists(potential_path):
-                    return os.path.normpath(potential_path)
-                
-                # Package import (check for __init__.py or index.js)
-                if ext in ['.py', '.js']:
-                    index_file = '__init__.py' if ext == '.py' else 'index.js'
-                    package_path = os.path.join(base_path, index_file)
-                    if os.path.exists(package_path):
-                        return os.path.normpath(package_path)
+            stem = os.path.normpath(base_path)
+
+            # Package import (__init__.py or index.js), and direct file import
+            # unless the path ends in a separator and so can only be a directory
+            candidates = [self._package_index.get(stem)]
+            if not base_path.endswith(os.sep):
+                candidates.append(self._module_index.get(stem))
+            found = [candidate for candidate in candidates if candidate]
+            if found:
+                return min(found)[1]
         
         # Terraform module resolution
         if import_name.startswith('.'):
             # Relative module
             potential_path = os.path.normpath(os.path.join(source_dir, import_name))
-            if os.path.exists(potential_path):
+            if potential_path in self._all_dirs or potential_path in self._all_files:
                 return potential_path
         
         return None
@@ -437,8 +674,10 @@ class GitHubRepoAnalyzer:
     def export_summary(self, output_file="repo_json_summary.json"):
         """Export the repository summary to a JSON file"""
         summary = self.generate_summary()
-        
-        with open(output_file, 'w') as f:
+
+        # json.dump streams the encoder's chunks into the file as it goes; the
+        # large buffer turns them into a few big writes
+        with open(output_file, 'w', buffering=_WRITE_BUFFER_SIZE) as f:
             json.dump(summary, f, indent=2)
             
         print(f"Repository summary exported to {output_file}")
@@ -457,95 +696,78 @@ class GitHubRepoAnalyzer:
             output.append(f"  {ext}: {count}")
             
         output.append("\nTop-level structure:")
-        
-        # Helper function to build structure string
-        def build_structure_string(structure, depth=4, max_depth=None, indent="  "):
-            if max_depth is not None and depth > max_depth:
-                return [f"{indent * depth}..."]
-                
-            structure_lines = []
-            for key, value in sorted(structure.items()):
-                if isinstance(value, dict) and not any(isinstance(value[k], dict) for k in value.keys() if k != "dependencies"):
-                    dep_count = len(value.get("dependencies", [])) if "dependencies" in value else 0
-                    if dep_count > 0:
-                        structure_lines.append(f"{indent * depth}F {key} [{dep_count} deps]")
+
+        # Walk the structure once, collecting the structure lines, the files with
+        # dependencies and the Terraform components together
+        structure_lines = []
+        files_with_deps = []
+        modules = {}
+        resources = {}
+        data_sources = {}
+        variables = set()
+
+        max_depth = 6
+        indent = "  "
+        top, children = self._child_indices()
+
+        # Pushed in reverse, so popping the stack visits entries in name order
+        stack = [(idx, "", 4) for idx in reversed(top)]
+        while stack:
+            idx, path, depth = stack.pop()
+            key, _, is_dir, deps = self.nodes[idx]
+            current_path = path + key
+            show = depth <= max_depth
+
+            if not is_dir:
+                deps = deps or []
+                if show:
+                    if deps:
+                        structure_lines.append(f"{indent * depth}F {key} [{len(deps)} deps]")
                     else:
                         structure_lines.append(f"{indent * depth}F {key}")
-                else:
+                if deps:
+                    files_with_deps.append((current_path, len(deps)))
+
+                for dep in deps:
+                    if dep.startswith('module:'):
+                        _, module_name, module_source = dep.split(':', 2)
+                        modules[module_name] = module_source
+                    elif dep.startswith('resource:'):
+                        _, resource_type, resource_name = dep.split(':', 2)
+                        resources.setdefault(resource_type, []).append(resource_name)
+                    elif dep.startswith('data:'):
+                        _, data_type, data_name = dep.split(':', 2)
+                        data_sources.setdefault(data_type, []).append(data_name)
+                    elif dep.startswith('var:'):
+                        variables.add(dep.split(':', 1)[1])
+            else:
+                if show:
                     structure_lines.append(f"{indent * depth}D {key}/")
-                    if max_depth is None or depth < max_depth:
-                        structure_lines.extend(build_structure_string(value, depth + 1, max_depth, indent))
-            return structure_lines
-            
-        output.extend(build_structure_string(self.file_structure, depth=4, max_depth=6))
-        
+                child_path = current_path + os.sep
+                stack.extend((child, child_path, depth + 1) for child in reversed(children[idx]))
+
+        output.extend(structure_lines)
+
         output.append("\nMost connected files (with most dependencies):")
-        # Collect files with dependencies from the structure
-        files_with_deps = []
-        
-        def collect_deps(structure, path=""):
-            for key, value in structure.items():
-                current_path = os.path.join(path, key)
-                
-                if isinstance(value, dict) and "dependencies" in value:
-                    files_with_deps.append((current_path, len(value["dependencies"])))
-                
-                elif isinstance(value, dict) and any(isinstance(value[k], dict) for k in value.keys()):
-                    collect_deps(value, current_path)
-        
-        collect_deps(self.file_structure)
         
         # Sort and display top files
-        top_files = sorted(files_with_deps, key=lambda x: x[1], reverse=True)[:5]
+        top_files = heapq.nlargest(5, files_with_deps, key=lambda x: x[1])
         for file, dep_count in top_files:
             output.append(f"  {file}: {dep_count} dependencies")
             
         # Add Terraform-specific summary if applicable
         if '.tf' in summary['file_types']:
-            output.extend(self._get_terraform_summary())
+            output.extend(self._get_terraform_summary(modules, resources, data_sources, variables))
             
         # Write output to file
         with open('repo_print_summary.txt', 'w') as f:
             f.write('\n'.join(output))
             
-    def _get_terraform_summary(self):
+    def _get_terraform_summary(self, modules, resources, data_sources, variables):
         """Get Terraform-specific summary information as list of strings"""
         output = []
         output.append("\n=== Terraform Summary ===")
         
-        modules = {}
-        resources = {}
-        data_sources = {}
-        variables = set()
-        
-        # Collect Terraform components from the file structure
-        def collect_terraform_deps(structure, path=""):
-            for key, value in structure.items():
-                current_path = os.path.join(path, key)
-                
-                if isinstance(value, dict) and "dependencies" in value:
-                    for dep in value["dependencies"]:
-                        if dep.startswith('module:'):
-                            _, module_name, module_source = dep.split(':', 2)
-                            modules[module_name] = module_source
-                        elif dep.startswith('resource:'):
-                            _, resource_type, resource_name = dep.split(':', 2)
-                            if resource_type not in resources:
-                                resources[resource_type] = []
-                            resources[resource_type].append(resource_name)
-                        elif dep.startswith('data:'):
-                            _, data_type, data_name = dep.split(':', 2)
-                            if data_type not in data_sources:
-                                data_sources[data_type] = []
-                            data_sources[data_type].append(data_name)
-                        elif dep.startswith('var:'):
-                            variables.add(dep.split(':', 1)[1])
-                
-                elif isinstance(value, dict) and any(isinstance(value[k], dict) for k in value.keys()):
-                    collect_terraform_deps(value, current_path)
-        
-        collect_terraform_deps(self.file_structure)
-        
         # Add modules
         if modules:
             output.append("\nModules:")
@@ -580,8 +802,8 @@ class GitHubRepoAnalyzer:
             
         output = []
         for key, value in sorted(structure.items()):
-            if isinstance(value, dict) and not any(isinstance(value[k], dict) for k in value.keys() if k != "dependencies"):
-                dep_count = len(value.get("dependencies", [])) if "dependencies" in value else 0
+            if _is_file_node(value):
+                dep_count = len(value.get("dependencies", []))
                 if dep_count > 0:
                     output.append(f"{indent * depth}📄 {key} [{dep_count} deps]")
                 else:
@@ -599,6 +821,7 @@ def main():
     parser.add_argument("--path", help="Path to local repository")
     parser.add_argument("--output", default="repo_json_summary.json", help="Output file for the summary")
     parser.add_argument("--visualize", action="store_true", help="Generate visualizations")
+    parser.add_argument("--heavy-viz", action="store_true", help="Draw the structure diagram with matplotlib instead of as SVG (implies --visualize)")
     
     args = parser.parse_args()
     
@@ -615,8 +838,11 @@ def main():
         analyzer.print_summary()
         analyzer.export_summary(args.output)
         
-        if args.visualize:
-            analyzer.visualize_structure()
+        if args.visualize or args.heavy_viz:
+            if args.heavy_viz:
+                analyzer.visualize_structure()
+            else:
+                analyzer.visualize_structure_svg()
             analyzer.visualize_dependencies()
 
 
@@ -57,8 +57,8 @@ if prompt := st.chat_input("What modifications would you like to make to the VPC
         
         # Generate OpenAI response
         codebase = Codebase("repo_json_summary.json","repo_print_summary.txt", "terraform-aws-vpc")
-        response = codebase.client.run(agent=codebase.coder_agent, messages=st.session_state.messages)
-        full_response = response.messages[-1]["content"]
+        response_messages = codebase.run(st.session_state.messages)
+        full_response = response_messages[-1]["content"]
         message_placeholder.markdown(full_response)
     
     # Add assistant response to chat history
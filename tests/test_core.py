@@ -0,0 +1,163 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("swarm")
+pytest.importorskip("orjson")
+
+from swarm.util import function_to_json
+
+from agents import core
+
+
+@pytest.fixture
+def codebase(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    core._get_swarm.cache_clear()
+    (tmp_path / "repo_json_summary.json").write_text('{"structure": {}}')
+    (tmp_path / "repo_print_summary.txt").write_text("")
+    yield core.Codebase(
+        str(tmp_path / "repo_json_summary.json"),
+        str(tmp_path / "repo_print_summary.txt"),
+        str(tmp_path),
+        response_cache=str(tmp_path / "llm_response_cache"),
+    )
+    core._get_swarm.cache_clear()
+
+
+class Client:
+    """Stands in for the Swarm client, replying with a fixed conversation"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def run(self, **kwargs):
+        self.calls += 1
+        return type("Response", (), {"messages": self.reply})()
+
+
+def touch_later(path):
+    """Move path's mtime forward, so it reads as changed"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_get_code_contexts_with_tool_call_arguments(codebase, tmp_path):
+    main_tf = tmp_path / "main.tf"
+    main_tf.write_text('resource "aws_vpc" "this" {}\n')
+    variables_tf = tmp_path / "variables.tf"
+    variables_tf.write_text('variable "cidr" {}\n')
+
+    # The model fills in arguments to match the schema Swarm advertises for the tool
+    schema = function_to_json(codebase.get_code_contexts)
+    assert schema["function"]["parameters"]["properties"]["file_paths"]["type"] == "string"
+    arguments = json.dumps({"file_paths": f"{main_tf}\n{variables_tf}"})
+
+    result = codebase.get_code_contexts(**json.loads(arguments))
+
+    assert result == (
+        f"File: {main_tf}\n```\nresource \"aws_vpc\" \"this\" {{}}\n\n```\n\n"
+        f"File: {variables_tf}\n```\nvariable \"cidr\" {{}}\n\n```"
+    )
+
+
+def test_get_code_contexts_with_comma_separated_paths(codebase, tmp_path):
+    main_tf = tmp_path / "main.tf"
+    main_tf.write_text("locals {}\n")
+
+    result = codebase.get_code_contexts(f"{main_tf}, {main_tf}")
+
+    assert result.count(f"File: {main_tf}\n```\nlocals {{}}\n\n```") == 2
+
+
+def test_run_falls_back_to_the_model_when_the_response_cache_is_corrupt(codebase, tmp_path):
+    reply = [{"role": "assistant", "content": "Done"}]
+    codebase.client = Client(reply)
+    for suffix in (".dat", ".dir"):
+        (tmp_path / f"llm_response_cache{suffix}").write_text("'corrupt\n")
+
+    assert codebase.run([{"role": "user", "content": "Update the region"}]) == reply
+    assert codebase.client.calls == 1
+
+
+@pytest.fixture
+def edited_file(codebase, tmp_path):
+    """A repo file the fake client's reply says it edits"""
+    main_tf = tmp_path / "examples" / "simple" / "main.tf"
+    main_tf.parent.mkdir(parents=True)
+    main_tf.write_text('provider "aws" { region = "eu-west-1" }\n')
+    structure = {"examples": {"simple": {"main.tf": {}}}}
+    (tmp_path / "repo_json_summary.json").write_text(json.dumps({"structure": structure}))
+    codebase.client = Client([{"role": "assistant", "content": f"File: {main_tf}\n```\nprovider \"aws\" {{}}\n```"}])
+    return main_tf
+
+
+def test_run_serves_a_repeated_request_from_the_cache(codebase, edited_file):
+    messages = [{"role": "user", "content": "Change the region in the simple example to asia-south-1"}]
+
+    first = codebase.run(messages)
+    second = codebase.run(messages)
+
+    assert second == first == codebase.client.reply
+    assert codebase.client.calls == 1
+
+
+@pytest.mark.parametrize("changed", ["edited_file", "repo_json_summary.json", "repo_print_summary.txt"])
+def test_run_asks_the_model_again_after_a_change(codebase, edited_file, tmp_path, changed):
+    messages = [{"role": "user", "content": "Change the region in the simple example to asia-south-1"}]
+    codebase.run(messages)
+
+    touch_later(edited_file if changed == "edited_file" else tmp_path / changed)
+    codebase.run(messages)
+
+    assert codebase.client.calls == 2
+
+
+@pytest.mark.parametrize("request_text, model", [
+    ("Update the VPC CIDR in the outpost example to 10.0.0.0/22", core._LIGHT_MODEL),
+    ("Change the region in simple example from eu-west-1 to asia-south-1", core._LIGHT_MODEL),
+    ("Add a new private subnet tier with its own NAT gateways, route tables and NACLs across every example", None),
+    ("Remove the NAT gateway", None),
+    ("Update the tags in all examples", None),
+    ("Refactor the subnet module", None),
+    ("Set the instance tenancy in the simple example to \"dedicated\"", core._LIGHT_MODEL),
+    ("Set up VPC flow logs to a new S3 bucket with an IAM role and bucket policy", None),
+    ("Replace the NAT gateways with a transit gateway attachment and new route tables", None),
+    ("Update the outpost example to also create an EKS cluster with managed node groups", None),
+    ("Update the outpost example to create a new subnet in 10.0.4.0/24", None),
+    ("Change the region in the simple example", None),
+])
+def test_pick_model(request_text, model):
+    assert core._pick_model([{"role": "user", "content": request_text}]) == model
+
+
+def test_get_code_context_suggests_the_closest_path(codebase, tmp_path):
+    examples = ["complete", "ipv6", "network-acls", "outpost", "secondary-cidr", "simple", "vpc-flow-logs"]
+    structure = {"examples": {name: {"main.tf": {}, "variables.tf": {}} for name in examples}}
+    (tmp_path / "repo_json_summary.json").write_text(json.dumps({"structure": structure}))
+
+    result = codebase.get_code_context(f"{tmp_path}/examples/outposts/main.tf")
+
+    assert result.startswith(
+        f"Error: File {tmp_path}/examples/outposts/main.tf not found. Did you mean: {tmp_path}/examples/outpost/main.tf, "
+    )
+
+
+@pytest.mark.parametrize("header", [
+    "File: {path}",
+    "File: `{path}`",
+    "**File:** `{path}`",
+    "**File: {path}**",
+    "### File: {path}",
+    "- File: {path}",
+    "> File: {path}",
+])
+def test_referenced_files_with_markdown_headers(codebase, tmp_path, header):
+    structure = {"examples": {"simple": {"main.tf": {}}}}
+    (tmp_path / "repo_json_summary.json").write_text(json.dumps({"structure": structure}))
+    path = f"{tmp_path}/examples/simple/main.tf"
+    reply = f"Here is the change.\n\n{header.format(path=path)}\n```\nlocals {{}}\n```\n"
+
+    assert codebase.referenced_files(reply) == [path]
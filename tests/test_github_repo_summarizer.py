@@ -0,0 +1,157 @@
+import os
+
+import pytest
+
+import github_repo_summarizer
+from github_repo_summarizer import GitHubRepoAnalyzer
+
+
+FILES = {
+    "README.md": "# Example\n",
+    "main.tf": 'resource "aws_vpc" "this" {\n  cidr_block = var.cidr\n}\n',
+    "variables.tf": 'variable "cidr" {}\n',
+    "examples/simple/main.tf": (
+        'module "vpc" {\n  source = "../../"\n  cidr   = var.cidr\n}\n\n'
+        'resource "aws_eip" "nat" {\n  domain = "vpc"\n}\n\n'
+        'data "aws_region" "current" {\n}\n'
+    ),
+    "pkg/__init__.py": "",
+    "pkg/foo.py": "",
+    "pkg/foo/__init__.py": "",
+    "pkg/bar/__init__.py": "",
+    "pkg/main.py": "import foo\nfrom pkg import bar\nimport pkg.bar\nimport os\n",
+}
+
+
+def repo_path(*parts):
+    return os.path.join("repo", *parts)
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    for rel_path, content in FILES.items():
+        path = tmp_path / "repo" / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    # print_summary writes to the working directory, and paths are relative to it
+    monkeypatch.chdir(tmp_path)
+    analyzer = GitHubRepoAnalyzer(local_path="repo")
+    assert analyzer.analyze_repo()
+    return analyzer
+
+
+def test_generate_summary(analyzer):
+    summary = analyzer.generate_summary()
+
+    assert summary["file_count"] == 9
+    assert summary["directory_count"] == 5
+    assert summary["file_types"] == {".md": 1, ".tf": 3, ".py": 5}
+    assert summary["structure"] == {
+        "README.md": {},
+        "main.tf": {"dependencies": ["resource:aws_vpc:this", "var:cidr"]},
+        "variables.tf": {},
+        "examples": {
+            "simple": {
+                "main.tf": {
+                    "dependencies": [
+                        "repo",
+                        "module:vpc:repo",
+                        "resource:aws_eip:nat",
+                        "data:aws_region:current",
+                        "var:cidr",
+                    ]
+                }
+            }
+        },
+        "pkg": {
+            "__init__.py": {},
+            "foo.py": {},
+            "foo": {"__init__.py": {}},
+            "bar": {"__init__.py": {}},
+            "main.py": {
+                "dependencies": [
+                    repo_path("pkg", "foo.py"),
+                    repo_path("pkg", "__init__.py"),
+                    repo_path("pkg", "bar", "__init__.py"),
+                    repo_path("pkg", "bar", "__init__.py"),
+                    repo_path("pkg", "__init__.py"),
+                ]
+            },
+        },
+    }
+    # Only files with dependencies get an entry
+    assert set(analyzer.dependencies) == {
+        "main.tf",
+        os.path.join("examples", "simple", "main.tf"),
+        os.path.join("pkg", "main.py"),
+    }
+
+
+def test_module_file_is_preferred_over_package(analyzer):
+    source_file = os.path.join("pkg", "main.py")
+
+    assert analyzer._resolve_absolute_import(source_file, "foo") == repo_path("pkg", "foo.py")
+    assert analyzer._resolve_absolute_import(source_file, "bar") == repo_path("pkg", "bar", "__init__.py")
+    assert analyzer._resolve_absolute_import(source_file, "pkg.foo") == repo_path("pkg", "foo.py")
+    assert analyzer._resolve_absolute_import(source_file, "os") is None
+
+
+def test_print_summary(analyzer, tmp_path):
+    analyzer.print_summary()
+
+    assert (tmp_path / "repo_print_summary.txt").read_text().split("\n") == [
+        "",
+        "=== Repository Summary ===",
+        "Total files: 9",
+        "Total directories: 5",
+        "",
+        "File types:",
+        "  .py: 5",
+        "  .tf: 3",
+        "  .md: 1",
+        "",
+        "Top-level structure:",
+        "        F README.md",
+        "        D examples/",
+        "          D simple/",
+        "            F main.tf [5 deps]",
+        "        F main.tf [2 deps]",
+        "        D pkg/",
+        "          F __init__.py",
+        "          D bar/",
+        "            F __init__.py",
+        "          D foo/",
+        "            F __init__.py",
+        "          F foo.py",
+        "          F main.py [5 deps]",
+        "        F variables.tf",
+        "",
+        "Most connected files (with most dependencies):",
+        f"  {os.path.join('examples', 'simple', 'main.tf')}: 5 dependencies",
+        f"  {os.path.join('pkg', 'main.py')}: 5 dependencies",
+        "  main.tf: 2 dependencies",
+        "",
+        "=== Terraform Summary ===",
+        "",
+        "Modules:",
+        "  vpc: repo",
+        "",
+        "Resources:",
+        "  aws_eip: 1 resources",
+        "  aws_vpc: 1 resources",
+        "",
+        "Data Sources:",
+        "  aws_region: 1 instances",
+        "",
+        "Variables Referenced: 1",
+        "  var.cidr",
+    ]
+
+
+def test_parallel_scan_matches_sequential_scan(analyzer, monkeypatch):
+    monkeypatch.setattr(github_repo_summarizer, "_PARALLEL_SCAN_MIN_FILES", 1)
+    parallel = GitHubRepoAnalyzer(local_path="repo")
+    assert parallel.analyze_repo()
+
+    assert parallel.generate_summary() == analyzer.generate_summary()
+    assert parallel.nodes == analyzer.nodes